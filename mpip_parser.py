@@ -7,10 +7,18 @@ import os
 import re
 import json
 import argparse
+import asyncio
+import hashlib
+import keyword
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional
 import uuid # Import uuid for generating unique document IDs
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from collections import Counter, defaultdict
+from operator import itemgetter
 
 try:
     import firebase_admin
@@ -21,276 +29,438 @@ except ImportError:
     import sys
     sys.exit(1)
 
+try:
+    import orjson
+except ImportError:
+    # Optional: orjson makes --output-json much faster; fall back to the stdlib encoder
+    orjson = None
+
+# Reports are scanned as raw bytes; only the values kept in the output are
+# decoded (latin-1 never fails to decode)
+_ENCODING = 'latin-1'
+
+# "@ Key : value" header fields, keyed by the field name before the colon. Lines
+# come without their newline, so the value is simply the rest of the line and
+# the other '@ ' lines (collector rank, output dir, ...) cost one dict lookup
+_RUN_INFO_FIELDS = {
+    b'Command': 'command',
+    b'Version': 'version',
+    b'Start time': 'start_time',
+    b'Stop time': 'stop_time',
+    b'MPIP env var': 'mpip_env_var',
+}
+
+# Precompiled patterns, shared by every parse_file call in a batch run
+_BATCH_SIZE_RE = re.compile(r'--batch-size\s+(\d+)')
+_TASK_PREFIX = b'@ MPI Task Assignment'
+_TASK_RE = re.compile(rb'@ MPI Task Assignment\s*:\s*(\d+)\s+(\S+)')
+# Tags in the MPIP env var that identify the interface; add new interfaces here.
+# They are checked in order and the first one present wins, so tcp takes
+# priority when a value mentions several
+_INTERFACE_TAGS = {
+    'mpip_tcp': 'tcp',
+    'mpip_opx': 'opx',
+    'omni': 'opx',
+}
+
+# Section headers recognized by _tokenize, mapped to section names
+_SECTION_HEADERS = [
+    (b'@--- MPI Time (seconds) ---', 'mpi_time'),
+    (b'@--- Aggregate Time (top twenty', 'aggregate_time'),
+    (b'@--- Aggregate Sent Message Size', 'message_size'),
+    (b'@--- Callsite Time statistics', 'callsite'),
+]
+_SECTION_RULE = b'-----------'
+
+# Suffixes of the files picked up when the input path is a directory
+# FIX: Added '.mpiP' to the list of recognized suffixes
+_INPUT_SUFFIXES = {'.txt', '.out', '.log', '', '.mpiP'}
+
+# Maximum number of writes Firestore accepts in a single batch commit
+_FIRESTORE_BATCH_LIMIT = 500
+# A commit request must also stay under 10 MiB. Chunks are closed once their
+# estimated size reaches this budget, which leaves headroom for the per-write
+# overhead the estimate doesn't count
+_FIRESTORE_BATCH_BYTES = 9 * 1024 * 1024
+
+# Version of the document layout written by to_dict(), stored as
+# 'schema_version'. Documents without it are version 1, whose
+# callsite_stats['callsites'] was a list of one dict per row; version 2 stores
+# that table column-wise (see to_records)
+_SCHEMA_VERSION = 2
+
+# Column specs of the parsed tables, as (key, type) pairs for _make_row_parser:
+# 's' is a leading (possibly multi-word) name that ends at the first all-digit
+# token, 'i' an int, 'f' a float and 'r' a rank/task number, where '*' marks
+# the aggregate row
+_MPI_TIME_COLUMNS = (('task', 'r'), ('app_time', 'f'), ('mpi_time', 'f'), ('mpi_percentage', 'f'))
+_AGGREGATE_TIME_COLUMNS = (('call_type', 's'), ('site', 'i'), ('time_ms', 'f'), ('app_percentage', 'f'),
+                           ('mpi_percentage', 'f'), ('count', 'i'), ('cov', 'f'))
+_MESSAGE_SIZE_COLUMNS = (('call_type', 's'), ('site', 'i'), ('count', 'i'), ('total_bytes', 'f'),
+                         ('avg_bytes', 'f'), ('sent_percentage', 'f'))
+# The Callsite Time statistics table is stored column-wise
+_CALLSITE_COLUMNS = (('name', 's'), ('site', 'i'), ('rank', 'r'), ('count', 'i'), ('max_time', 'f'),
+                     ('mean_time', 'f'), ('min_time', 'f'), ('app_percentage', 'f'), ('mpi_percentage', 'f'))
+
+# Expressions converting a raw bytes token into each column type
+_CONVERSIONS = {
+    'i': 'int({0})',
+    'f': 'float({0})',
+    'r': "(int({0}) if {0} != b'*' else 'aggregate')",
+}
+
+def _make_row_parser(name: str, columns: tuple, header: Optional[bytes] = None, column_wise: bool = False):
+    """
+    Generate a row parser specialized to one table's column spec, in the
+    spirit of collections.namedtuple: the returned function(lines) unpacks
+    and converts each row with straight-line code instead of looping over
+    the spec for every row. It returns one dict per row, keyed like columns,
+    or with column_wise a single {key: [values]} dict of columns. Blank
+    rows, the header row (first token equal to header), rows with too few
+    values and rows that fail to convert are skipped.
+    """
+    # Column keys become local names and dict keys in the generated source, so
+    # check them the way namedtuple checks field names. The generated code's own
+    # locals start with an underscore, so valid keys can't shadow them
+    keys = [key for key, _ in columns]
+    for key in keys:
+        if not isinstance(key, str) or not key.isidentifier() or keyword.iskeyword(key) or key.startswith('_'):
+            raise ValueError(f"Column keys must be identifiers not starting with an underscore: {key!r}")
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"Duplicate column key in {keys!r}")
+    
+    named = columns[0][1] == 's'
+    value_columns = columns[1:] if named else columns
+    names = [key for key, _ in value_columns]
+    fields = [(key, _CONVERSIONS[kind].format(key)) for key, kind in value_columns]
+    if named:
+        fields.insert(0, (columns[0][0], "_label.decode(_ENCODING)"))
+    
+    source = [
+        f"def {name}(_lines):",
+    ]
+    if column_wise:
+        source += [
+            f"    _columns = {{{', '.join(f'{key!r}: []' for key in keys)}}}",
+        ]
+        source += [
+            f"    _add_{i} = _columns[{key!r}].append" for i, key in enumerate(keys)
+        ]
+    else:
+        source += [
+            "    _rows = []",
+            "    _add_row = _rows.append",
+        ]
+    source += [
+        "    for _line in _lines:",
+    ]
+    # str.split() already drops surrounding whitespace and returns [] for
+    # blank lines, so rows are only ever looked at through their tokens
+    source += [
+        "        _parts = _line.split()",
+    ]
+    if header:
+        source += [
+            f"        if not _parts or _parts[0] == {header!r}:",
+            "            continue",
+        ]
+    if named:
+        # Call names are nearly always a single word, so check for that before
+        # scanning for the first all-digit token
+        source += [
+            "        if len(_parts) > 1 and _parts[1].isdigit() and not _parts[0].isdigit():",
+            "            _idx = 1",
+            "            _label = _parts[0]",
+            "        else:",
+            "            _idx = 0",
+            "            while _idx < len(_parts) and not _parts[_idx].isdigit():",
+            "                _idx += 1",
+            "            _label = b' '.join(_parts[:_idx])",
+        ]
+    else:
+        source += [
+            "        _idx = 0",
+        ]
+    source += [
+        f"        _values = _parts[_idx:_idx + {len(names)}]",
+        f"        if len(_values) < {len(names)}:",
+        "            continue",
+        f"        {', '.join(names)}, = _values",
+        "        try:",
+    ]
+    if column_wise:
+        # Convert the whole row before appending, so a bad value leaves no
+        # partial row behind in the columns
+        source += [
+            f"            {key} = {expr}" for key, expr in fields
+        ]
+        source += [
+            "        except ValueError:",
+            "            continue",
+        ]
+        source += [
+            f"        _add_{i}({key})" for i, key in enumerate(keys)
+        ]
+        source += [
+            "    return _columns",
+        ]
+    else:
+        source += [
+            f"            _add_row({{{', '.join(f'{key!r}: {expr}' for key, expr in fields)}}})",
+            "        except ValueError:",
+            "            continue",
+            "    return _rows",
+        ]
+    
+    namespace = {'_ENCODING': _ENCODING}
+    exec(compile('\n'.join(source), f'<{name}>', 'exec'), namespace)
+    return namespace[name]
+
+_parse_mpi_time_rows = _make_row_parser('_parse_mpi_time_rows', _MPI_TIME_COLUMNS, header=b'Task')
+_parse_aggregate_time_rows = _make_row_parser('_parse_aggregate_time_rows', _AGGREGATE_TIME_COLUMNS, header=b'Call')
+_parse_message_size_rows = _make_row_parser('_parse_message_size_rows', _MESSAGE_SIZE_COLUMNS, header=b'Call')
+_parse_callsite_rows = _make_row_parser('_parse_callsite_rows', _CALLSITE_COLUMNS, column_wise=True)
+
+def to_records(columns: Dict[str, List]) -> List[Dict]:
+    """
+    Convert a column-oriented table back into a list of one dict per row.
+    Since schema_version 2, callsite_stats['callsites'] is such a table: one
+    list per _CALLSITE_COLUMNS key ('name', 'site', 'rank', 'count',
+    'max_time', 'mean_time', 'min_time', 'app_percentage',
+    'mpi_percentage'), with row i made of the i-th entry of every list.
+    """
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+@dataclass
+class ParsedExperiment:
+    """
+    Parsed contents of one mpiP report, as returned by MPIPParser.parse_file.
+    to_dict() gives the document that is uploaded and exported as JSON.
+    """
+    # Declared by hand instead of dataclass(slots=True), which needs Python 3.10
+    __slots__ = ('schema_version', 'filename', 'filepath', 'interface_type', 'run_info',
+                 'mpi_time_stats', 'aggregate_time_stats', 'message_size_stats', 'callsite_stats',
+                 'parsing_timestamp', 'summary')
+    
+    schema_version: int
+    filename: str
+    filepath: str
+    interface_type: str
+    run_info: Dict
+    mpi_time_stats: Dict
+    aggregate_time_stats: Dict
+    message_size_stats: Dict
+    callsite_stats: Dict
+    parsing_timestamp: str
+    summary: Dict
+    
+    def to_dict(self) -> Dict:
+        """Shallow dict of the fields, in declaration order; the nested stats are shared, not copied"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
 class MPIPParser:
-    def __init__(self):
-        self.data = {}
-        
-    def parse_file(self, filepath: str, provided_interface_type: Optional[str] = None) -> Dict:
+    # The parser keeps no per-instance state, so one instance can parse any number of files
+    __slots__ = ()
+    
+    def parse_file(self, filepath: str, provided_interface_type: Optional[str] = None,
+                   parsing_timestamp: Optional[str] = None) -> ParsedExperiment:
         """
         Parse a single mpiP profiling file.
         Args:
             filepath (str): The path to the mpiP log file.
             provided_interface_type (Optional[str]): The interface type (e.g., 'tcp', 'opx')
                                                      provided by the user. Defaults to None.
+            parsing_timestamp (Optional[str]): ISO timestamp recorded as 'parsing_timestamp'.
+                                               Batch runs pass one shared value; defaults to now.
         Returns:
-            Dict: A dictionary containing the parsed data.
+            ParsedExperiment: The parsed data; use .to_dict() for a plain dictionary.
         """
-        # FIX: Changed encoding to 'latin-1' to handle potential UnicodeDecodeError
-        with open(filepath, 'r', encoding='latin-1') as f: 
-            content = f.read()
+        if parsing_timestamp is None:
+            parsing_timestamp = datetime.now().isoformat()
         
+        # Split the report into its header lines and table sections in a
+        # single pass over the buffered binary file. The lines are copied out,
+        # so the file is closed before the (slower) extraction
+        with open(filepath, 'rb') as f:
+            sections = self._tokenize(f)
+        
+        return self._assemble(sections, filepath, provided_interface_type, parsing_timestamp)
+    
+    def _assemble(self, sections: Dict[str, List[bytes]], filepath: str, provided_interface_type: Optional[str],
+                  parsing_timestamp: str) -> ParsedExperiment:
+        """
+        Build the parsed experiment from the sections found by _tokenize. Each
+        section is popped as it is converted, so its raw lines can be freed
+        before the next table is parsed.
+        """
         # Extract basic run information
-        run_info = self._extract_run_info(content)
+        run_info = self._extract_run_info(sections.pop('run_info'))
         
         # Extract MPI time statistics
-        mpi_time_stats = self._extract_mpi_time_stats(content)
+        mpi_time_stats = self._extract_mpi_time_stats(sections.pop('mpi_time', None))
         
         # Extract aggregate time statistics
-        aggregate_time_stats = self._extract_aggregate_time_stats(content)
+        aggregate_time_stats = self._extract_aggregate_time_stats(sections.pop('aggregate_time', None))
         
         # Extract message size statistics
-        message_size_stats = self._extract_message_size_stats(content)
+        message_size_stats = self._extract_message_size_stats(sections.pop('message_size', None))
         
         # Extract callsite statistics
-        callsite_stats = self._extract_callsite_stats(content)
+        callsite_stats = self._extract_callsite_stats(sections.pop('callsite', None))
         
         # Determine interface type: prioritize provided_interface_type, then try to infer from env var in log
-        interface_type = provided_interface_type if provided_interface_type else self._infer_interface_from_log(content)
+        interface_type = provided_interface_type if provided_interface_type else self._infer_interface_from_log(run_info.get('mpip_env_var'))
         
         # Compile all data
-        parsed_data = {
-            'filename': os.path.basename(filepath),
-            'filepath': filepath,
-            'interface_type': interface_type,
-            'run_info': run_info,
-            'mpi_time_stats': mpi_time_stats,
-            'aggregate_time_stats': aggregate_time_stats,
-            'message_size_stats': message_size_stats,
-            'callsite_stats': callsite_stats,
-            'parsing_timestamp': datetime.now().isoformat(),
-            'summary': self._generate_summary(run_info, mpi_time_stats, aggregate_time_stats)
-        }
-        
-        return parsed_data
-    
-    def _extract_run_info(self, content: str) -> Dict:
-        """Extract basic run information"""
+        return ParsedExperiment(
+            schema_version=_SCHEMA_VERSION,
+            filename=os.path.basename(filepath),
+            filepath=filepath,
+            interface_type=interface_type,
+            run_info=run_info,
+            mpi_time_stats=mpi_time_stats,
+            aggregate_time_stats=aggregate_time_stats,
+            message_size_stats=message_size_stats,
+            callsite_stats=callsite_stats,
+            parsing_timestamp=parsing_timestamp,
+            summary=self._generate_summary(run_info, mpi_time_stats, aggregate_time_stats)
+        )
+    
+    def _extract_run_info(self, lines: List[bytes]) -> Dict:
+        """Extract basic run information from the '@ ' header lines"""
         info = {}
+        task_assignments = []
         
-        # Command
-        command_match = re.search(r'@ Command\s*:\s*(.+)', content)
-        if command_match:
-            command_str = command_match.group(1).strip()
-            info['command'] = command_str
+        for line in lines:
+            # Task assignments (nodes) make up most of the header, one per rank
+            if line.startswith(_TASK_PREFIX):
+                match = _TASK_RE.match(line)
+                if match:
+                    task_assignments.append({
+                        'rank': int(match.group(1)),
+                        'node': match.group(2).decode(_ENCODING)
+                    })
+                continue
             
-            # NEW: Extract batch size from the command string
-            batch_size_match = re.search(r'--batch-size\s+(\d+)', command_str)
+            # Simple "@ Key : value" header fields; the first occurrence wins
+            colon = line.find(b':')
+            if colon == -1:
+                continue
+            key = _RUN_INFO_FIELDS.get(line[2:colon].rstrip())
+            if key is not None and key not in info:
+                value = line[colon + 1:]
+                if value:
+                    info[key] = value.strip().decode(_ENCODING)
+        
+        # NEW: Extract batch size from the command string
+        if 'command' in info:
+            batch_size_match = _BATCH_SIZE_RE.search(info['command'])
             if batch_size_match:
                 info['batch_size'] = int(batch_size_match.group(1))
             else:
                 info['batch_size'] = 'N/A' # Default if not found
         
-        # Version
-        version_match = re.search(r'@ Version\s*:\s*(.+)', content)
-        if version_match:
-            info['version'] = version_match.group(1).strip()
-        
-        # Start and stop times
-        start_match = re.search(r'@ Start time\s*:\s*(.+)', content)
-        if start_match:
-            info['start_time'] = start_match.group(1).strip()
-            
-        stop_match = re.search(r'@ Stop time\s*:\s*(.+)', content)
-        if stop_match:
-            info['stop_time'] = stop_match.group(1).strip()
-
-        # MPIP env var (for interface inference if not provided by user)
-        env_var_match = re.search(r'@ MPIP env var\s*:\s*(.+)', content)
-        if env_var_match:
-            info['mpip_env_var'] = env_var_match.group(1).strip()
-        
-        # Extract task assignments (nodes)
-        task_assignments = []
-        task_pattern = r'@ MPI Task Assignment\s*:\s*(\d+)\s+(\S+)'
-        for match in re.finditer(task_pattern, content):
-            task_assignments.append({
-                'rank': int(match.group(1)),
-                'node': match.group(2)
-            })
-        
         info['task_assignments'] = task_assignments
         info['num_processes'] = len(task_assignments)
         
-        # Extract unique nodes
-        unique_nodes = list(set(task['node'] for task in task_assignments))
+        # Extract unique nodes, in order of first appearance so the stored
+        # document is the same on every run
+        unique_nodes = list(dict.fromkeys(task['node'] for task in task_assignments))
         info['nodes'] = unique_nodes
         info['num_nodes'] = len(unique_nodes)
         
         return info
     
-    def _extract_mpi_time_stats(self, content: str) -> Dict:
+    def _tokenize(self, lines: Iterable[bytes]) -> Dict[str, List[bytes]]:
+        """
+        Split the report into its parts in one pass over its lines.
+        Outside of a table section, '@ ' header lines are collected under
+        'run_info'. A table section starts at one of the _SECTION_HEADERS (the
+        rule line right below the header is skipped) and ends at the next rule
+        line; sections that are never closed are dropped. Only the first
+        occurrence of each section is kept.
+        """
+        header_lines = []
+        sections = {'run_info': header_lines}
+        current_section = None
+        current_lines = []
+        skip_rule = False
+        
+        for line in lines:
+            if current_section is None:
+                if line.startswith(b'@ '):
+                    # Table rows lose their newline in split(); header lines are kept whole
+                    header_lines.append(line.rstrip(b'\n'))
+                elif line.startswith(b'@---'):
+                    for header, name in _SECTION_HEADERS:
+                        if line.startswith(header) and name not in sections:
+                            current_section = name
+                            current_lines = []
+                            skip_rule = True
+                            break
+                continue
+            
+            if line.startswith(_SECTION_RULE):
+                if skip_rule:
+                    skip_rule = False
+                    continue
+                sections[current_section] = current_lines
+                current_section = None
+                continue
+            
+            skip_rule = False
+            current_lines.append(line)
+        
+        return sections
+    
+    def _extract_mpi_time_stats(self, lines: Optional[List[bytes]]) -> Dict:
         """Extract MPI time statistics table"""
         stats = {}
         
-        # Find the MPI Time section
-        time_section = re.search(r'@--- MPI Time \(seconds\) ---.*?\n(.*?)\n-----------', content, re.DOTALL)
-        if time_section:
-            lines = time_section.group(1).strip().split('\n')
-            task_stats = []
-            
-            for line in lines:
-                if line.strip() and not line.startswith('Task'):
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        try:
-                            task_stats.append({
-                                'task': int(parts[0]) if parts[0] != '*' else 'aggregate',
-                                'app_time': float(parts[1]),
-                                'mpi_time': float(parts[2]),
-                                'mpi_percentage': float(parts[3])
-                            })
-                        except ValueError:
-                            continue
+        if lines is not None:
+            task_stats = _parse_mpi_time_rows(lines)
             
             stats['task_stats'] = task_stats
             
             # Extract aggregate stats (marked with *)
-            aggregate_stats = [s for s in task_stats if s['task'] == 'aggregate']
-            if aggregate_stats:
-                stats['aggregate'] = aggregate_stats[0]
+            aggregate = next((s for s in task_stats if s['task'] == 'aggregate'), None)
+            if aggregate is not None:
+                stats['aggregate'] = aggregate
         
         return stats
     
-    def _extract_aggregate_time_stats(self, content: str) -> Dict:
+    def _extract_aggregate_time_stats(self, lines: Optional[List[bytes]]) -> Dict:
         """Extract aggregate time statistics"""
-        stats = {'operations': []}
-        
-        # Find the Aggregate Time section
-        agg_section = re.search(r'@--- Aggregate Time \(top twenty.*?\n(.*?)\n-----------', content, re.DOTALL)
-        if agg_section:
-            lines = agg_section.group(1).strip().split('\n')
-            
-            for line in lines:
-                if line.strip() and not line.startswith('Call'):
-                    parts = line.split()
-                    if len(parts) >= 6:
-                        try:
-                            # Handle multi-word call_type like 'Allreduce' or 'MPI_Comm_rank'
-                            call_type_parts = []
-                            idx = 0
-                            while idx < len(parts) and not parts[idx].isdigit():
-                                call_type_parts.append(parts[idx])
-                                idx += 1
-                            call_type = ' '.join(call_type_parts)
-
-                            remaining_parts = parts[idx:]
-                            if len(remaining_parts) >= 6:
-                                stats['operations'].append({
-                                    'call_type': call_type,
-                                    'site': int(remaining_parts[0]),
-                                    'time_ms': float(remaining_parts[1]),
-                                    'app_percentage': float(remaining_parts[2]),
-                                    'mpi_percentage': float(remaining_parts[3]),
-                                    'count': int(remaining_parts[4]),
-                                    'cov': float(remaining_parts[5])
-                                })
-                        except ValueError:
-                            continue
+        if not lines:
+            return {'operations': []}
         
-        return stats
+        return {'operations': _parse_aggregate_time_rows(lines)}
     
-    def _extract_message_size_stats(self, content: str) -> Dict:
+    def _extract_message_size_stats(self, lines: Optional[List[bytes]]) -> Dict:
         """Extract message size statistics"""
-        stats = {'operations': []}
-        
-        # Find the Message Size section
-        msg_section = re.search(r'@--- Aggregate Sent Message Size.*?\n(.*?)\n-----------', content, re.DOTALL)
-        if msg_section:
-            lines = msg_section.group(1).strip().split('\n')
-            
-            for line in lines:
-                if line.strip() and not line.startswith('Call'):
-                    parts = line.split()
-                    if len(parts) >= 5:
-                        try:
-                            # Handle multi-word call_type
-                            call_type_parts = []
-                            idx = 0
-                            while idx < len(parts) and not parts[idx].isdigit():
-                                call_type_parts.append(parts[idx])
-                                idx += 1
-                            call_type = ' '.join(call_type_parts)
-
-                            remaining_parts = parts[idx:]
-                            if len(remaining_parts) >= 5:
-                                stats['operations'].append({
-                                    'call_type': call_type,
-                                    'site': int(remaining_parts[0]),
-                                    'count': int(remaining_parts[1]),
-                                    'total_bytes': float(remaining_parts[2]),
-                                    'avg_bytes': float(remaining_parts[3]),
-                                    'sent_percentage': float(remaining_parts[4])
-                                })
-                        except ValueError:
-                            continue
+        if not lines:
+            return {'operations': []}
         
-        return stats
+        return {'operations': _parse_message_size_rows(lines)}
     
-    def _extract_callsite_stats(self, content: str) -> Dict:
-        """Extract detailed callsite statistics"""
-        stats = {'callsites': []}
-        
-        # Find the Callsite Time statistics section
-        callsite_section = re.search(r'@--- Callsite Time statistics.*?\n(.*?)\n-----------', content, re.DOTALL)
-        if callsite_section:
-            lines = callsite_section.group(1).strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                parts = line.split()
-                if len(parts) >= 8:
-                    try:
-                        # Handle multi-word name
-                        name_parts = []
-                        idx = 0
-                        while idx < len(parts) and not parts[idx].isdigit():
-                            name_parts.append(parts[idx])
-                            idx += 1
-                        name = ' '.join(name_parts)
-
-                        remaining_parts = parts[idx:]
-                        if len(remaining_parts) >= 8:
-                            stats['callsites'].append({
-                                'name': name,
-                                'site': int(remaining_parts[0]),
-                                'rank': int(remaining_parts[1]) if remaining_parts[1] != '*' else 'aggregate',
-                                'count': int(remaining_parts[2]),
-                                'max_time': float(remaining_parts[3]),
-                                'mean_time': float(remaining_parts[4]),
-                                'min_time': float(remaining_parts[5]),
-                                'app_percentage': float(remaining_parts[6]),
-                                'mpi_percentage': float(remaining_parts[7])
-                            })
-                    except ValueError:
-                        continue
-        
-        return stats
+    def _extract_callsite_stats(self, lines: Optional[List[bytes]]) -> Dict:
+        """
+        Extract detailed callsite statistics.
+        The table is stored column-wise ({column: [values]}, see
+        _CALLSITE_COLUMNS) since it holds one row per callsite per rank; use
+        to_records() to get one dict per row.
+        """
+        return {'callsites': _parse_callsite_rows(lines or ())}
     
-    def _infer_interface_from_log(self, content: str) -> str:
+    def _infer_interface_from_log(self, env_var: Optional[str]) -> str:
         """
-        Infers interface type from the 'MPIP env var' in the log content.
-        Defaults to 'unknown' if not found or recognized.
+        Infers interface type from the 'MPIP env var' value already extracted
+        into run_info. Defaults to 'unknown' if not found or recognized.
         """
-        env_var_match = re.search(r'@ MPIP env var\s*:\s*(.+)', content)
-        if env_var_match:
-            env_var_value = env_var_match.group(1).lower()
-            if 'mpip_tcp' in env_var_value:
-                return 'tcp'
-            elif 'mpip_opx' in env_var_value or 'omni' in env_var_value:
-                return 'opx'
+        if env_var:
+            env_var = env_var.lower()
+            return next((interface for tag, interface in _INTERFACE_TAGS.items() if tag in env_var), 'unknown')
         return 'unknown'
     
     def _generate_summary(self, run_info: Dict, mpi_time_stats: Dict, aggregate_time_stats: Dict) -> Dict:
@@ -312,64 +482,360 @@ class MPIPParser:
         if aggregate_time_stats['operations']:
             summary['top_operations'] = aggregate_time_stats['operations'][:5]
             
-            # Count operations by type
-            op_counts = {}
-            op_times = {}
-            for op in aggregate_time_stats['operations']:
-                op_type = op['call_type']
-                op_counts[op_type] = op_counts.get(op_type, 0) + 1
-                op_times[op_type] = op_times.get(op_type, 0) + op['time_ms']
+            # Count operations by type; Counter tallies in C
+            operations = aggregate_time_stats['operations']
+            op_counts = Counter(map(itemgetter('call_type'), operations))
+            op_times = defaultdict(float)
+            for op in operations:
+                op_times[op['call_type']] += op['time_ms']
             
-            summary['operation_counts'] = op_counts
-            summary['operation_times'] = op_times
+            summary['operation_counts'] = dict(op_counts)
+            summary['operation_times'] = dict(op_times)
         
         return summary
 
-class FirebaseUploader:
+def _estimated_size(experiment: Dict) -> int:
+    """
+    Rough serialized size of an experiment document in bytes, as the length
+    of its JSON. That is close to the size of Firestore's wire encoding; the
+    margin below the 10 MiB limit in _FIRESTORE_BATCH_BYTES absorbs the
+    difference.
+    """
+    if orjson is not None:
+        return len(orjson.dumps(experiment))
+    return len(json.dumps(experiment))
+
+class _FirestoreUploader:
+    """
+    Document placement and batch chunking shared by FirebaseUploader and
+    AsyncFirebaseUploader. Subclasses provide the Firestore client and drive
+    the commits.
+    """
     def __init__(self, credentials_path: str):
         """Initialize Firebase connection"""
+        # Initialize the default Firebase app once per process
         if not firebase_admin._apps:
             cred = credentials.Certificate(credentials_path)
             firebase_admin.initialize_app(cred)
         
-        self.db = firestore.client()
+        self.db = self._client()
+        self._collections = {}
     
-    def upload_experiment(self, data: Dict) -> str:
-        """Upload experiment data to Firebase"""
+    def _client(self):
+        """Create the Firestore client documents are written with"""
+        raise NotImplementedError
+    
+    @property
+    def project(self) -> str:
+        """ID of the Google Cloud project documents are written to"""
+        return self.db.project
+    
+    def _document_ref(self, data: Dict, doc_path: Optional[str] = None):
+        """
+        Build the Firestore document reference an experiment is stored under,
+        reusing doc_path if given (to overwrite an earlier upload)
+        """
+        if doc_path is not None:
+            return self.db.document(doc_path)
+        
         interface_type = data['interface_type']
         # num_nodes = data['run_info']['num_nodes'] # No longer directly in path
         batch_size = data['run_info'].get('batch_size', 'N/A') 
 
-        # Use a more robust collection path structure for user-specific data
-        # artifacts/{appId}/users/{userId}/mpiP_experiments/{interface_type}/{batch_size}_batchsize/{documentId}
-        app_id = "thesis" # Can be customized
-        user_id = "jonamarkin" # Can be customized or passed as arg
+        # Experiments of a batch run share a handful of collections, so build
+        # each CollectionReference (and parse its path) only once
+        collection = self._collections.get((interface_type, batch_size))
+        if collection is None:
+            # Use a more robust collection path structure for user-specific data
+            # artifacts/{appId}/users/{userId}/mpiP_experiments/{interface_type}/{batch_size}_batchsize/{documentId}
+            app_id = "thesis" # Can be customized
+            user_id = "jonamarkin" # Can be customized or passed as arg
 
-        # UPDATED: Collection path now only includes interface_type and batch_size
-        collection_path = f"artifacts/{app_id}/users/{user_id}/mpiP_experiments/{interface_type}/{batch_size}_batchsize"
+            # UPDATED: Collection path now only includes interface_type and batch_size
+            collection_path = f"artifacts/{app_id}/users/{user_id}/mpiP_experiments/{interface_type}/{batch_size}_batchsize"
+            collection = self._collections[(interface_type, batch_size)] = self.db.collection(collection_path)
         
         # Generate a unique document ID using UUID
         doc_id = f"{uuid.uuid4().hex}" 
         
-        # Upload to Firebase
-        doc_ref = self.db.collection(collection_path).document(doc_id)
+        return collection.document(doc_id)
+    
+    def _batch_chunks(self, experiments: Iterable[Dict], doc_paths: List[Optional[str]],
+                      existing_paths: Optional[Dict[str, str]] = None) -> Iterator[List[tuple]]:
+        """
+        Yield chunks of (index, doc_ref, experiment) entries that each fit in
+        one batch commit, as soon as enough experiments have arrived to fill
+        one. A chunk holds up to _FIRESTORE_BATCH_LIMIT experiments and up to
+        _FIRESTORE_BATCH_BYTES of estimated document size; an experiment
+        larger than that on its own gets a chunk to itself. A None slot is
+        appended to doc_paths for every experiment. Experiments whose document
+        reference can't be built are reported and left out.
+        """
+        existing_paths = existing_paths or {}
+        pending = []
+        pending_bytes = 0
+        for index, experiment in enumerate(experiments):
+            doc_paths.append(None)
+            try:
+                doc_ref = self._document_ref(experiment, existing_paths.get(experiment.get('filepath')))
+                size = len(doc_ref.path) + _estimated_size(experiment)
+            except Exception as e:
+                print(f"Failed to upload {experiment.get('filename', 'unknown')}: {e}")
+                continue
+            if pending and pending_bytes + size > _FIRESTORE_BATCH_BYTES:
+                yield pending
+                pending = []
+                pending_bytes = 0
+            pending.append((index, doc_ref, experiment))
+            pending_bytes += size
+            if len(pending) == _FIRESTORE_BATCH_LIMIT:
+                yield pending
+                pending = []
+                pending_bytes = 0
+        if pending:
+            yield pending
+
+class FirebaseUploader(_FirestoreUploader):
+    """Uploader on Firestore's blocking client, committing batches from a thread pool"""
+    def _client(self):
+        return firestore.client()
+    
+    def upload_experiment(self, data: Dict) -> str:
+        """Upload experiment data to Firebase"""
+        doc_ref = self._document_ref(data)
         doc_ref.set(data)
         
-        print(f"Uploaded to: {collection_path}/{doc_id}")
-        return doc_id
+        print(f"Uploaded to: {doc_ref.path}")
+        return doc_ref.id
     
-    def batch_upload(self, experiments: List[Dict]) -> List[str]:
-        """Upload multiple experiments in batch"""
-        doc_ids = []
+    def _commit_batch(self, pending: List[tuple]) -> None:
+        """Write (index, doc_ref, experiment) entries in a single batch commit"""
+        batch = self.db.batch()
+        for _, doc_ref, experiment in pending:
+            batch.set(doc_ref, experiment)
+        batch.commit()
+    
+    def batch_upload(self, experiments: Iterable[Dict], max_in_flight: int = 16,
+                     existing_paths: Optional[Dict[str, str]] = None,
+                     doc_paths: Optional[List[Optional[str]]] = None) -> List[Optional[str]]:
+        """
+        Upload multiple experiments using Firestore batched writes.
+        Experiments are committed in chunks of up to _FIRESTORE_BATCH_LIMIT
+        documents (fewer for large ones, see _batch_chunks), with up to
+        max_in_flight commits in flight at once; if a chunk fails to commit,
+        its documents are retried one by one so a single bad experiment
+        doesn't sink the whole chunk.
+        experiments may be a lazy iterable (e.g. files still being parsed):
+        each chunk is committed as soon as it fills up.
+        existing_paths maps experiment filepaths to the document paths of
+        earlier uploads, which are overwritten instead of creating new documents.
+        Returns the document paths in the same order as experiments, with None
+        for experiments that failed to upload. They are written into doc_paths
+        if given, so if iterating experiments raises part way through, the
+        caller still has the paths of the chunks already committed.
+        """
+        if doc_paths is None:
+            doc_paths = []
         
-        for experiment in experiments:
+        # Firestore RPCs release the GIL, so threads overlap the network round-trips
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            commits = []
             try:
-                doc_id = self.upload_experiment(experiment)
-                doc_ids.append(doc_id)
+                for pending in self._batch_chunks(experiments, doc_paths, existing_paths):
+                    commits.append((pending, executor.submit(self._commit_batch, pending)))
+            finally:
+                self._finish_commits(executor, commits, doc_paths)
+        
+        return doc_paths
+    
+    def _finish_commits(self, executor: ThreadPoolExecutor, commits: List[tuple],
+                        doc_paths: List[Optional[str]]) -> None:
+        """Wait for batch_upload's (pending, future) commits, retrying failed chunks one document at a time"""
+        retries = []
+        for pending, future in commits:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Batch commit of {len(pending)} experiments failed ({e}), retrying individually")
+                retries.extend((index, doc_ref, experiment, executor.submit(doc_ref.set, experiment))
+                               for index, doc_ref, experiment in pending)
+                continue
+            for index, doc_ref, _ in pending:
+                print(f"Uploaded to: {doc_ref.path}")
+                doc_paths[index] = doc_ref.path
+        
+        for index, doc_ref, experiment, future in retries:
+            try:
+                future.result()
             except Exception as e:
                 print(f"Failed to upload {experiment.get('filename', 'unknown')}: {e}")
+                continue
+            print(f"Uploaded to: {doc_ref.path}")
+            doc_paths[index] = doc_ref.path
+
+class AsyncFirebaseUploader(_FirestoreUploader):
+    """
+    Counterpart of FirebaseUploader built on Firestore's asyncio client, so
+    many commits can be in flight at once without a thread per request.
+    upload_experiment and batch_upload are coroutines; drive them with
+    asyncio.run().
+    """
+    def _client(self):
+        # firestore_async needs firebase-admin 6.0+, so only require it when used
+        from firebase_admin import firestore_async
+        return firestore_async.client()
+    
+    async def upload_experiment(self, data: Dict) -> str:
+        """Upload experiment data to Firebase"""
+        doc_ref = self._document_ref(data)
+        await doc_ref.set(data)
         
-        return doc_ids
+        print(f"Uploaded to: {doc_ref.path}")
+        return doc_ref.id
+    
+    async def _commit_batch(self, pending: List[tuple]) -> None:
+        """Write (index, doc_ref, experiment) entries in a single batch commit"""
+        batch = self.db.batch()
+        for _, doc_ref, experiment in pending:
+            batch.set(doc_ref, experiment)
+        await batch.commit()
+    
+    async def batch_upload(self, experiments: Iterable[Dict], max_in_flight: int = 64,
+                           existing_paths: Optional[Dict[str, str]] = None,
+                           doc_paths: Optional[List[Optional[str]]] = None) -> List[Optional[str]]:
+        """
+        Upload multiple experiments using Firestore batched writes, like
+        FirebaseUploader.batch_upload, with up to max_in_flight commits
+        awaited concurrently.
+        existing_paths maps experiment filepaths to the document paths of
+        earlier uploads, which are overwritten instead of creating new documents.
+        Returns the document paths in the same order as experiments, with None
+        for experiments that failed to upload (written into doc_paths if given).
+        """
+        if doc_paths is None:
+            doc_paths = []
+        chunks = list(self._batch_chunks(experiments, doc_paths, existing_paths))
+        limit = asyncio.Semaphore(max_in_flight)
+        
+        async def bounded(coro):
+            async with limit:
+                return await coro
+        
+        results = await asyncio.gather(*(bounded(self._commit_batch(pending)) for pending in chunks),
+                                       return_exceptions=True)
+        
+        retries = []
+        for pending, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                print(f"Batch commit of {len(pending)} experiments failed ({result}), retrying individually")
+                retries.extend(pending)
+                continue
+            for index, doc_ref, _ in pending:
+                print(f"Uploaded to: {doc_ref.path}")
+                doc_paths[index] = doc_ref.path
+        
+        results = await asyncio.gather(*(bounded(doc_ref.set(experiment)) for _, doc_ref, experiment in retries),
+                                       return_exceptions=True)
+        for (index, doc_ref, experiment), result in zip(retries, results):
+            if isinstance(result, Exception):
+                print(f"Failed to upload {experiment.get('filename', 'unknown')}: {result}")
+                continue
+            print(f"Uploaded to: {doc_ref.path}")
+            doc_paths[index] = doc_ref.path
+        
+        return doc_paths
+
+def _parse_one(file_path: str, interface_type: Optional[str] = None,
+               parsing_timestamp: Optional[str] = None) -> Optional[ParsedExperiment]:
+    """
+    Parse a single file in a worker process.
+    Returns None (after reporting the error) if the file could not be parsed.
+    """
+    try:
+        return MPIPParser().parse_file(file_path, provided_interface_type=interface_type,
+                                       parsing_timestamp=parsing_timestamp)
+    except Exception as e:
+        print(f"Error parsing {file_path}: {e}")
+        return None
+
+def _file_digest(file_path: str) -> Optional[str]:
+    """SHA-256 of a file's contents, checked against its upload cache entry (None if unreadable)"""
+    try:
+        with open(file_path, 'rb') as f:
+            if hasattr(hashlib, 'file_digest'):
+                return hashlib.file_digest(f, 'sha256').hexdigest()
+            digest = hashlib.sha256()
+            for chunk in iter(partial(f.read, 1 << 20), b''):
+                digest.update(chunk)
+            return digest.hexdigest()
+    except OSError:
+        return None
+
+def _cached_document(upload_cache: Dict[str, Dict], project: str, file_path: str,
+                     digest: str, interface_type: str) -> Optional[str]:
+    """
+    Path of the document file_path was uploaded to in project, or None if it
+    wasn't uploaded there or its contents or --interface-type changed since
+    """
+    entry = upload_cache.get(project, {}).get(os.path.abspath(file_path))
+    if entry and entry['digest'] == digest and entry['interface_type'] == interface_type:
+        return entry['document']
+    return None
+
+def _record_upload(upload_cache: Dict[str, Dict], project: str, file_path: str,
+                   digest: str, interface_type: str, doc_path: str) -> None:
+    """Remember that file_path was uploaded to doc_path, for _cached_document"""
+    upload_cache.setdefault(project, {})[os.path.abspath(file_path)] = {
+        'digest': digest,
+        'interface_type': interface_type,
+        'document': doc_path,
+    }
+
+def _load_upload_cache(cache_path: str) -> Dict[str, Dict]:
+    """
+    Load the upload cache of previously uploaded files, laid out as
+    {project: {absolute file path: {'digest', 'interface_type', 'document'}}}
+    """
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable upload cache {cache_path}: {e}")
+        return {}
+
+def _save_upload_cache(cache_path: str, upload_cache: Dict[str, Dict]) -> None:
+    """Persist the upload cache read by _load_upload_cache"""
+    try:
+        with open(cache_path, 'w') as f:
+            json.dump(upload_cache, f, indent=2)
+    except OSError as e:
+        print(f"Unable to save upload cache {cache_path}: {e}")
+
+def _walk(root: str) -> Iterator[str]:
+    """
+    Recursively yield the non-empty report files under root, without following
+    directory symlinks. scandir reports each entry's type along with its name,
+    so only files with a matching suffix cost a stat() call.
+    """
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif (os.path.splitext(entry.name)[1] in _INPUT_SUFFIXES and entry.is_file()
+                  and entry.stat().st_size > 0):
+                yield entry.path
+        except OSError:
+            continue
+
+def _map_chunksize(num_tasks: int, workers: int, limit: int = 8) -> int:
+    """Batch up to `limit` files per worker round-trip while every worker still gets a few batches"""
+    return max(1, min(limit, num_tasks // (workers * 4)))
 
 def main():
     parser = argparse.ArgumentParser(description='Parse mpiP profiling results and upload to Firebase')
@@ -379,12 +845,18 @@ def main():
                         help='Specify the interface type (e.g., "tcp", "opx"). Defaults to "unknown" or inferred from log.')
     parser.add_argument('--output-json', help='Also save parsed data to JSON file')
     parser.add_argument('--dry-run', action='store_true', help='Parse files but don\'t upload to Firebase')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of parallel parser processes. Defaults to the number of CPUs.')
+    parser.add_argument('--cache', default='.mpip_cache.json',
+                        help='File recording, per Firebase project, the contents hash, interface type and document path '
+                             'of every uploaded file, so unchanged files are not uploaded again on later runs. '
+                             'Defaults to .mpip_cache.json.')
+    parser.add_argument('--force', action='store_true', help='Upload files even if they were uploaded before, overwriting each file\'s earlier document')
+    parser.add_argument('--async-upload', action='store_true',
+                        help='Upload with Firestore\'s asyncio client instead of a thread pool (needs firebase-admin 6.0+)')
     
     args = parser.parse_args()
     
-    # Initialize parser
-    mpip_parser = MPIPParser()
-    
     # Find all files to process
     files_to_process = []
     input_path = Path(args.input_path)
@@ -393,10 +865,7 @@ def main():
         files_to_process = [str(input_path)]
     elif input_path.is_dir():
         # Find all text files in directory
-        for file_path in input_path.rglob('*'):
-            # FIX: Added '.mpiP' to the list of recognized suffixes
-            if file_path.is_file() and file_path.suffix in ['.txt', '.out', '.log', '', '.mpiP'] and file_path.stat().st_size > 0:
-                files_to_process.append(str(file_path))
+        files_to_process = list(_walk(str(input_path)))
     else:
         print(f"Error: {input_path} is not a valid file or directory")
         return
@@ -407,33 +876,117 @@ def main():
     
     print(f"Found {len(files_to_process)} files to process")
     
-    # Parse all files
-    parsed_experiments = []
-    for file_path in files_to_process:
+    # Connect before parsing so batches can be committed while later files are still being parsed
+    uploader = None
+    if not args.dry_run:
         try:
-            print(f"Parsing: {file_path}")
-            # Pass the provided interface type to the parser
-            data = mpip_parser.parse_file(file_path, provided_interface_type=args.interface_type)
-            parsed_experiments.append(data)
-            print(f"  - Interface: {data['interface_type']}, Nodes: {data['run_info']['num_nodes']}, Batch Size: {data['run_info'].get('batch_size', 'N/A')}, MPI%: {data['summary'].get('total_mpi_percentage', 'N/A')}")
+            if args.async_upload:
+                uploader = AsyncFirebaseUploader(args.credentials)
+            else:
+                uploader = FirebaseUploader(args.credentials)
         except Exception as e:
-            print(f"Error parsing {file_path}: {e}")
+            print(f"Error uploading to Firebase: {e}")
     
-    # Save to JSON if requested
-    if args.output_json:
-        with open(args.output_json, 'w') as f:
-            json.dump(parsed_experiments, f, indent=2)
-        print(f"Saved parsed data to {args.output_json}")
+    # Parse all files in parallel; each file is independent and parsing is CPU-bound
+    parsed_experiments = []
+    uploaded_experiments = []
+    uploaded_paths = []
+    upload_cache = {}
+    digests = {}
+    already_uploaded = set()
+    existing_paths = {}
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Don't upload files whose exact contents were already uploaded on a
+            # previous run. They are still parsed, for --output-json and the summary
+            if uploader is not None:
+                upload_cache = _load_upload_cache(args.cache)
+                chunksize = _map_chunksize(len(files_to_process), workers)
+                cached = {}
+                for p, digest in zip(files_to_process, executor.map(_file_digest, files_to_process, chunksize=chunksize)):
+                    if digest is None:
+                        continue
+                    digests[p] = digest
+                    doc_path = _cached_document(upload_cache, uploader.project, p, digest, args.interface_type)
+                    if doc_path:
+                        cached[p] = doc_path
+                if args.force:
+                    # Overwrite each file's earlier document instead of uploading a duplicate
+                    existing_paths = cached
+                else:
+                    already_uploaded = set(cached)
+                    if already_uploaded:
+                        print(f"Not uploading {len(already_uploaded)} files already uploaded (use --force to upload them again)")
+            
+            # Pass the provided interface type to the parser; all files in a run share one timestamp
+            parse = partial(_parse_one, interface_type=args.interface_type, parsing_timestamp=datetime.now().isoformat())
+            results = executor.map(parse, files_to_process, chunksize=_map_chunksize(len(files_to_process), workers))
+            
+            def collect():
+                # Files that fail to parse are reported by _parse_one; this only
+                # catches the pool itself failing (e.g. a killed worker), which
+                # ends the results early and shouldn't look like an upload error
+                received = 0
+                try:
+                    for file_path, data in zip(files_to_process, results):
+                        received += 1
+                        if data is None:
+                            continue
+                        parsed_experiments.append(data)
+                        print(f"Parsed: {file_path}")
+                        print(f"  - Interface: {data.interface_type}, Nodes: {data.run_info['num_nodes']}, Batch Size: {data.run_info.get('batch_size', 'N/A')}, MPI%: {data.summary.get('total_mpi_percentage', 'N/A')}")
+                        yield data
+                except Exception as e:
+                    print(f"Error parsing files, {len(files_to_process) - received} not parsed: {e}")
+            experiments = collect()
+            
+            def new_uploads(experiments):
+                for data in experiments:
+                    if data.filepath not in already_uploaded:
+                        uploaded_experiments.append(data)
+                        yield data.to_dict()
+            
+            # The thread-pool uploader consumes experiments as they are parsed; the
+            # asyncio one can't wait on the pool without blocking its event loop
+            if uploader is not None and not args.async_upload:
+                try:
+                    uploader.batch_upload(new_uploads(experiments), existing_paths=existing_paths, doc_paths=uploaded_paths)
+                except Exception as e:
+                    print(f"Error uploading to Firebase: {e}")
+            for _ in experiments:
+                pass
+    finally:
+        # Keep what was parsed even if the parse or upload failed part way
+        if args.output_json:
+            if orjson is not None:
+                # orjson serializes dataclasses natively, without building the dicts
+                with open(args.output_json, 'wb') as f:
+                    f.write(orjson.dumps(parsed_experiments, option=orjson.OPT_INDENT_2))
+            else:
+                with open(args.output_json, 'w') as f:
+                    json.dump([exp.to_dict() for exp in parsed_experiments], f, indent=2)
+            print(f"Saved parsed data to {args.output_json}")
     
     # Upload to Firebase unless dry run
-    if not args.dry_run:
+    if uploader is not None and args.async_upload:
         try:
-            uploader = FirebaseUploader(args.credentials)
-            uploaded_ids = uploader.batch_upload(parsed_experiments)
-            print(f"Successfully uploaded {len(uploaded_ids)} experiments to Firebase")
+            asyncio.run(uploader.batch_upload(list(new_uploads(parsed_experiments)),
+                                              existing_paths=existing_paths, doc_paths=uploaded_paths))
         except Exception as e:
             print(f"Error uploading to Firebase: {e}")
-    else:
+    
+    if uploader is not None:
+        # Remember what was uploaded, including before an upload error, so the next run can skip it
+        for experiment, doc_path in zip(uploaded_experiments, uploaded_paths):
+            digest = digests.get(experiment.filepath)
+            if doc_path and digest:
+                _record_upload(upload_cache, uploader.project, experiment.filepath,
+                               digest, args.interface_type, doc_path)
+        _save_upload_cache(args.cache, upload_cache)
+        
+        print(f"Successfully uploaded {sum(1 for doc_path in uploaded_paths if doc_path)} experiments to Firebase")
+    elif args.dry_run:
         print("Dry run mode - skipping Firebase upload")
     
     # Print summary
@@ -443,9 +996,9 @@ def main():
     batch_size_counts = {} # NEW: Track batch size counts
     
     for exp in parsed_experiments:
-        interface = exp['interface_type']
-        nodes = exp['run_info']['num_nodes']
-        batch_size = exp['run_info'].get('batch_size', 'N/A') # NEW: Get batch size
+        interface = exp.interface_type
+        nodes = exp.run_info['num_nodes']
+        batch_size = exp.run_info.get('batch_size', 'N/A') # NEW: Get batch size
 
         interface_counts[interface] = interface_counts.get(interface, 0) + 1
         node_counts[nodes] = node_counts.get(nodes, 0) + 1
@@ -0,0 +1,352 @@
+"""
+Regression checks for the report tokenizer and the generated table parsers.
+Run with: python -m unittest discover tests (or python -m pytest)
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import firebase_admin  # noqa: F401 - mpip_parser exits at import time without it
+except ImportError:
+    raise unittest.SkipTest("firebase-admin is not installed")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mpip_parser
+from mpip_parser import (FirebaseUploader, MPIPParser, _cached_document, _load_upload_cache,
+                         _record_upload, _save_upload_cache, to_records)
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'report.mpiP')
+TIMESTAMP = '2025-07-14T08:00:00'
+
+
+def _read_fixture() -> bytes:
+    with open(FIXTURE, 'rb') as f:
+        return f.read()
+
+
+class FakeDocument:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[1]
+
+    def set(self, data):
+        self.client.documents[self.path] = data
+
+
+class FakeCollection:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+
+    def document(self, doc_id):
+        return FakeDocument(self.client, f'{self.path}/{doc_id}')
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, doc_ref, data):
+        self.writes.append((doc_ref, data))
+
+    def commit(self):
+        self.client.commits.append(len(self.writes))
+        for doc_ref, data in self.writes:
+            doc_ref.set(data)
+
+
+class FakeFirestore:
+    """Just enough of firestore.Client for FirebaseUploader, keeping documents in memory"""
+    def __init__(self, project='test-project'):
+        self.project = project
+        self.documents = {}
+        self.commits = []
+
+    def document(self, path):
+        return FakeDocument(self, path)
+
+    def collection(self, path):
+        return FakeCollection(self, path)
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def _fake_uploader(db=None) -> FirebaseUploader:
+    with mock.patch.object(FirebaseUploader, '_client', lambda self: db or FakeFirestore()), \
+         mock.patch.object(mpip_parser.firebase_admin, '_apps', {'[DEFAULT]': None}):
+        return FirebaseUploader('unused.json')
+
+
+def _experiment(name: str, padding: int = 0) -> dict:
+    return {'filename': name, 'filepath': f'/runs/{name}', 'interface_type': 'tcp',
+            'run_info': {'batch_size': 8}, 'padding': 'x' * padding}
+
+
+class ParseFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def parse(self, content: bytes) -> dict:
+        """Parse content written to a temporary report file, as a plain dict"""
+        path = os.path.join(self.tmp.name, 'report.mpiP')
+        with open(path, 'wb') as f:
+            f.write(content)
+        data = MPIPParser().parse_file(path, parsing_timestamp=TIMESTAMP).to_dict()
+        del data['filepath']
+        return data
+
+    def test_run_info(self):
+        run_info = MPIPParser().parse_file(FIXTURE, parsing_timestamp=TIMESTAMP).run_info
+        self.assertEqual(run_info['command'], 'python /home/u/train.py --epochs 10 --batch-size 8 --log-interval 1')
+        self.assertEqual(run_info['version'], '3.5.0')
+        self.assertEqual(run_info['start_time'], '2025 07 14 07:13:08')
+        self.assertEqual(run_info['stop_time'], '2025 07 14 07:42:52')
+        self.assertEqual(run_info['batch_size'], 8)
+        self.assertEqual(run_info['task_assignments'], [{'rank': 0, 'node': 'node01'},
+                                                        {'rank': 1, 'node': 'node02'},
+                                                        {'rank': 2, 'node': 'node01'}])
+        self.assertEqual(run_info['nodes'], ['node01', 'node02'])
+        self.assertEqual((run_info['num_processes'], run_info['num_nodes']), (3, 2))
+
+    def test_tables(self):
+        data = MPIPParser().parse_file(FIXTURE, parsing_timestamp=TIMESTAMP)
+        self.assertEqual(data.schema_version, 2)
+
+        self.assertEqual([task['task'] for task in data.mpi_time_stats['task_stats']], [0, 1, 2, 'aggregate'])
+        self.assertEqual(data.mpi_time_stats['aggregate'],
+                         {'task': 'aggregate', 'app_time': 5340.0, 'mpi_time': 3920.0, 'mpi_percentage': 73.1})
+
+        operations = data.aggregate_time_stats['operations']
+        self.assertEqual([op['call_type'] for op in operations], ['Allreduce', 'File write all', 'Allreduce'])
+        self.assertEqual(operations[1], {'call_type': 'File write all', 'site': 3, 'time_ms': 12.5,
+                                         'app_percentage': 0.0, 'mpi_percentage': 0.0, 'count': 4, 'cov': 0.1})
+
+        self.assertEqual(data.message_size_stats['operations'][0],
+                         {'call_type': 'Allreduce', 'site': 1, 'count': 19546, 'total_bytes': 4e11,
+                          'avg_bytes': 2.04e7, 'sent_percentage': 99.99})
+
+        callsites = data.callsite_stats['callsites']
+        self.assertEqual(callsites['name'], ['Allgather', 'Allgather', 'File write all'])
+        self.assertEqual(callsites['rank'], [0, 'aggregate', 1])
+        self.assertEqual(to_records(callsites)[2], {'name': 'File write all', 'site': 3, 'rank': 1, 'count': 4,
+                                                    'max_time': 12.0, 'mean_time': 3.1, 'min_time': 0.5,
+                                                    'app_percentage': 0.0, 'mpi_percentage': 0.0})
+
+        summary = data.summary
+        self.assertEqual(summary['operation_counts'], {'Allreduce': 2, 'File write all': 1})
+        self.assertEqual(summary['operation_times'], {'Allreduce': 1310100.0, 'File write all': 12.5})
+        self.assertEqual(summary['total_mpi_percentage'], 73.1)
+
+    def test_crlf_and_missing_final_newline(self):
+        expected = self.parse(_read_fixture())
+        self.assertEqual(self.parse(_read_fixture().replace(b'\n', b'\r\n')), expected)
+        self.assertEqual(self.parse(_read_fixture().rstrip(b'\n')), expected)
+
+    def test_unclosed_section_is_dropped(self):
+        content = _read_fixture()
+        cut = content.index(b'File write all       3')
+        data = self.parse(content[:cut])
+        self.assertEqual(data['callsite_stats']['callsites']['name'], [])
+        self.assertEqual(len(data['aggregate_time_stats']['operations']), 3)
+
+    def test_only_first_section_is_kept(self):
+        duplicate = (b'@--- MPI Time (seconds) ---------------------------------------------------\n'
+                     b'---------------------------------------------------------------------------\n'
+                     b'   *   9.99e+03   9.99e+03    99.99\n'
+                     b'---------------------------------------------------------------------------\n')
+        data = self.parse(_read_fixture() + duplicate)
+        self.assertEqual(data['mpi_time_stats']['aggregate']['mpi_percentage'], 73.1)
+
+    def test_empty_report(self):
+        data = self.parse(b'')
+        self.assertEqual(data['run_info']['num_processes'], 0)
+        self.assertEqual(data['mpi_time_stats'], {})
+        self.assertEqual(data['aggregate_time_stats'], {'operations': []})
+        self.assertEqual(data['callsite_stats']['callsites']['name'], [])
+        self.assertEqual(data['interface_type'], 'unknown')
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_rule_after_header_is_skipped(self):
+        sections = MPIPParser()._tokenize([
+            b'@ Version : 3.5.0\n',
+            b'@--- Aggregate Time (top twenty, descending, milliseconds) ---\n',
+            b'----------------------------------------------------------------\n',
+            b'Call Site Time App% MPI% Count COV\n',
+            b'----------------------------------------------------------------\n',
+            b'@--- MPI Time (seconds) ---\n',
+            b'   0   1.0   0.5   50.0\n',
+            b'----------------------------------------------------------------\n',
+        ])
+        self.assertEqual(sections['run_info'], [b'@ Version : 3.5.0'])
+        self.assertEqual(sections['aggregate_time'], [b'Call Site Time App% MPI% Count COV\n'])
+        # A section without the rule below its header keeps its first row
+        self.assertEqual(sections['mpi_time'], [b'   0   1.0   0.5   50.0\n'])
+
+
+class RowParserTest(unittest.TestCase):
+    def test_skipped_rows(self):
+        rows = mpip_parser._parse_aggregate_time_rows([
+            b'Call                 Site       Time    App%    MPI%      Count    COV\n',
+            b'\n',
+            b'Allreduce               1   1.31e+06   36.80\n',
+            b'Allreduce               1        abc   36.80   50.00      19546   0.00\n',
+            b'Send                   12         10    1.00    2.00          3   0.50\n',
+        ])
+        self.assertEqual(rows, [{'call_type': 'Send', 'site': 12, 'time_ms': 10.0, 'app_percentage': 1.0,
+                                 'mpi_percentage': 2.0, 'count': 3, 'cov': 0.5}])
+
+    def test_multi_word_names(self):
+        rows = mpip_parser._parse_message_size_rows([
+            b'File write all    3    4    32    8    0.50\n',
+            b'  Comm   split    7    1     4    4    0.00\n',
+        ])
+        self.assertEqual([(row['call_type'], row['site']) for row in rows], [('File write all', 3), ('Comm split', 7)])
+
+    def test_aggregate_rank(self):
+        rows = mpip_parser._parse_mpi_time_rows([b'Task AppTime MPITime MPI%\n', b'   *   2.0   1.0   50.0\n'])
+        self.assertEqual(rows, [{'task': 'aggregate', 'app_time': 2.0, 'mpi_time': 1.0, 'mpi_percentage': 50.0}])
+
+    def test_column_wise(self):
+        columns = mpip_parser._parse_callsite_rows([
+            b'Allgather  1   0   4   1.5   1.0   0.5   0.10   0.20\n',
+            b'Allgather  1   *   4   1.5   bad   0.5   0.10   0.20\n',
+        ])
+        self.assertEqual(list(columns), [key for key, _ in mpip_parser._CALLSITE_COLUMNS])
+        self.assertEqual(columns['rank'], [0])
+        self.assertEqual(columns['mean_time'], [1.0])
+        self.assertEqual(mpip_parser._parse_callsite_rows([])['name'], [])
+
+    def test_invalid_column_keys(self):
+        for key in ('class', 'not valid', '_lines', '1st'):
+            with self.assertRaises(ValueError):
+                mpip_parser._make_row_parser('parse', (('task', 'r'), (key, 'f')))
+        with self.assertRaises(ValueError):
+            mpip_parser._make_row_parser('parse', (('task', 'r'), ('task', 'f')))
+
+
+class BatchUploadTest(unittest.TestCase):
+    def setUp(self):
+        # The uploader reports every document it writes
+        stdout = mock.patch('sys.stdout', new_callable=io.StringIO)
+        stdout.start()
+        self.addCleanup(stdout.stop)
+
+    def test_chunks_respect_write_and_size_limits(self):
+        uploader = _fake_uploader()
+        uploader.batch_upload([_experiment(f'r{i}') for i in range(1001)])
+        self.assertEqual(uploader.db.commits, [500, 500, 1])
+
+        uploader = _fake_uploader()
+        with mock.patch.object(mpip_parser, '_FIRESTORE_BATCH_BYTES', 5000):
+            doc_paths = uploader.batch_upload([_experiment(f'r{i}', padding=2000) for i in range(5)]
+                                              + [_experiment('huge', padding=9000)])
+        self.assertEqual(uploader.db.commits, [2, 2, 1, 1])
+        self.assertTrue(all(doc_paths))
+
+    def test_keeps_committed_paths_when_experiments_raise(self):
+        def experiments():
+            yield from (_experiment(f'r{i}') for i in range(600))
+            raise RuntimeError('parse failed')
+
+        uploader = _fake_uploader()
+        doc_paths = []
+        with self.assertRaises(RuntimeError):
+            uploader.batch_upload(experiments(), doc_paths=doc_paths)
+        self.assertEqual(uploader.db.commits, [500])
+        self.assertEqual(len(doc_paths), 600)
+        self.assertTrue(all(doc_paths[:500]))
+        self.assertFalse(any(doc_paths[500:]))
+
+    def test_existing_paths_are_overwritten(self):
+        uploader = _fake_uploader()
+        doc_paths = uploader.batch_upload([_experiment('a'), _experiment('b')],
+                                          existing_paths={'/runs/a': 'earlier/a'})
+        self.assertEqual(doc_paths[0], 'earlier/a')
+        self.assertTrue(doc_paths[1].startswith('artifacts/'))
+        self.assertEqual(set(uploader.db.documents), set(doc_paths))
+
+
+class UploadCacheTest(unittest.TestCase):
+    def test_entries_are_per_file_and_project(self):
+        cache = {}
+        _record_upload(cache, 'p', '/runs/a', 'digest', 'tcp', 'docs/a')
+        _record_upload(cache, 'p', '/runs/b', 'digest', 'tcp', 'docs/b')
+        self.assertEqual(_cached_document(cache, 'p', '/runs/a', 'digest', 'tcp'), 'docs/a')
+        self.assertEqual(_cached_document(cache, 'p', '/runs/b', 'digest', 'tcp'), 'docs/b')
+        self.assertIsNone(_cached_document(cache, 'q', '/runs/a', 'digest', 'tcp'))
+        self.assertIsNone(_cached_document(cache, 'p', '/runs/a', 'changed', 'tcp'))
+        self.assertIsNone(_cached_document(cache, 'p', '/runs/a', 'digest', 'opx'))
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.json')
+            self.assertEqual(_load_upload_cache(path), {})
+            cache = {}
+            _record_upload(cache, 'p', '/runs/a', 'digest', 'tcp', 'docs/a')
+            _save_upload_cache(path, cache)
+            self.assertEqual(_load_upload_cache(path), cache)
+
+
+class MainTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # Two files with identical contents, which must still get a document each
+        self.runs = os.path.join(self.tmp.name, 'runs')
+        os.mkdir(self.runs)
+        for name in ('a.mpiP', 'b.mpiP'):
+            with open(os.path.join(self.runs, name), 'wb') as f:
+                f.write(_read_fixture())
+
+    def run_main(self, db, *options):
+        argv = ['mpip_parser.py', self.runs, '--credentials', 'unused.json', '--workers', '1',
+                '--cache', os.path.join(self.tmp.name, 'cache.json'), *options]
+        with mock.patch.object(sys, 'argv', argv), \
+             mock.patch.object(FirebaseUploader, '_client', lambda self: db), \
+             mock.patch.object(mpip_parser.firebase_admin, '_apps', {'[DEFAULT]': None}), \
+             mock.patch('sys.stdout', new_callable=io.StringIO):
+            mpip_parser.main()
+
+    def test_force_overwrites_each_files_own_document(self):
+        db = FakeFirestore()
+        self.run_main(db)
+        uploaded = set(db.documents)
+        self.assertEqual(len(uploaded), 2)
+
+        self.run_main(db)
+        self.assertEqual(db.commits, [2])
+
+        self.run_main(db, '--force')
+        self.assertEqual(db.commits, [2, 2])
+        self.assertEqual(set(db.documents), uploaded)
+
+    def test_cache_is_per_project(self):
+        self.run_main(FakeFirestore())
+        other = FakeFirestore(project='other-project')
+        self.run_main(other)
+        self.assertEqual(len(other.documents), 2)
+
+
+class InterfaceTest(unittest.TestCase):
+    def test_tags_are_checked_in_table_order(self):
+        infer = MPIPParser()._infer_interface_from_log
+        self.assertEqual(infer('-f /scratch/omni_runs/mpip_tcp_8'), 'tcp')
+        self.assertEqual(infer('-f /scratch/MPIP_OPX_16'), 'opx')
+        self.assertEqual(infer('-f /scratch/omni_16'), 'opx')
+        self.assertEqual(infer('-k 2'), 'unknown')
+        self.assertEqual(infer(None), 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()